@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+FitSnap read endpoint benchmark
+Reports bytes on the wire and latency per endpoint, per content coding,
+and for conditional requests answered with 304
+"""
+
+import os
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8001")
+API_BASE = f"{BACKEND_URL}/api"
+USER_ID = os.getenv("BENCH_USER_ID", "demo-user")
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "50"))
+
+ENDPOINTS = {
+    "get_brands": f"{API_BASE}/brands",
+    "get_user_measurements": f"{API_BASE}/measurements/{USER_ID}",
+    "get_size_recommendations": f"{API_BASE}/recommendations/{USER_ID}",
+}
+ENCODINGS = ["identity", "gzip", "br"]
+
+def fetch(url, headers):
+    """Return (status, wire bytes, response headers, latency ms) for one GET"""
+    request = urllib.request.Request(url, headers=headers)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            # urllib does not decode content codings, so this is what crossed the wire
+            body = response.read()
+            status, response_headers = response.status, response.headers
+    except urllib.error.HTTPError as error:
+        body = error.read()
+        status, response_headers = error.code, error.headers
+    return status, len(body), response_headers, (time.perf_counter() - started) * 1000
+
+def bench(url, headers):
+    results = [fetch(url, headers) for _ in range(ITERATIONS)]
+    status, wire_bytes, response_headers, _ = results[-1]
+    latencies = sorted(result[3] for result in results)
+    return {
+        "status": status,
+        "bytes": wire_bytes,
+        "encoding": response_headers.get("content-encoding", "identity"),
+        "etag": response_headers.get("etag"),
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+def main():
+    print(f"Benchmarking {API_BASE} ({ITERATIONS} requests per row)")
+    print(f"{'endpoint':<26} {'request':<14} {'status':>6} {'coding':>8} {'bytes':>8} {'p50 ms':>8} {'p95 ms':>8}")
+
+    for name, url in ENDPOINTS.items():
+        for encoding in ENCODINGS:
+            result = bench(url, {"Accept-Encoding": encoding})
+            print(f"{name:<26} {encoding:<14} {result['status']:>6} {result['encoding']:>8} "
+                  f"{result['bytes']:>8} {result['p50']:>8.2f} {result['p95']:>8.2f}")
+
+        etag = bench(url, {"Accept-Encoding": "gzip"})["etag"]
+        if etag:
+            result = bench(url, {"Accept-Encoding": "gzip", "If-None-Match": etag})
+            print(f"{name:<26} {'if-none-match':<14} {result['status']:>6} {result['encoding']:>8} "
+                  f"{result['bytes']:>8} {result['p50']:>8.2f} {result['p95']:>8.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
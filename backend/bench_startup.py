@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+FitSnap startup benchmark
+Measures module import time and time-to-first-response of a fresh worker
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Budgets can be tightened or relaxed per environment
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1000"))
+FIRST_RESPONSE_BUDGET_MS = float(os.getenv("STARTUP_FIRST_RESPONSE_BUDGET_MS", "3000"))
+
+def measure_import_time(top=10):
+    """Import server under -X importtime and return (total_ms, slowest modules)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    modules = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = [part.strip() for part in line.split(":", 1)[1].split("|")]
+        modules.append((int(cumulative_us), name))
+        # The server module's cumulative time includes everything it pulls in
+        if name == "server":
+            total_us = int(cumulative_us)
+
+    modules.sort(reverse=True)
+    return total_us / 1000, [(us / 1000, name) for us, name in modules[:top]]
+
+def find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_time_to_first_response(path="/api/brands", timeout=30.0):
+    """Start a uvicorn worker and return ms until a MongoDB-backed endpoint answers"""
+    port = find_free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"No response from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    import_ms, slowest = measure_import_time()
+    print(f"Import time: {import_ms:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    for cumulative_ms, name in slowest:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    first_response_ms = measure_time_to_first_response()
+    print(f"Time to first response: {first_response_ms:.1f} ms (budget {FIRST_RESPONSE_BUDGET_MS:.0f} ms)")
+
+    within_budget = import_ms <= IMPORT_BUDGET_MS and first_response_ms <= FIRST_RESPONSE_BUDGET_MS
+    return 0 if within_budget else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+FitSnap analytics export
+Streams db.measurements and db.recommendations to NDJSON, Parquet or Arrow
+files in constant memory, resuming from a created_at checkpoint
+
+Exports read from secondaries when available and walk the collection in
+(created_at, id) order over an index on {created_at: 1, id: 1}. This CLI
+creates the index if missing; the HTTP export only checks for it. The cursor
+hints the index so a dropped index fails fast instead of sorting in memory.
+Rows are written to part files that are only renamed into place (and
+checkpointed) once complete, so an interrupted run resumes after the last
+finished part.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+EXPORT_FIELDS = {
+    "measurements": {
+        "id": "string",
+        "user_id": "string",
+        "chest": "double",
+        "waist": "double",
+        "hips": "double",
+        "height": "double",
+        "weight": "double",
+        "shoulder_width": "double",
+        "arm_length": "double",
+        "leg_length": "double",
+        "created_at": "string",
+    },
+    "recommendations": {
+        "id": "string",
+        "user_id": "string",
+        "brand": "string",
+        "category": "string",
+        "recommended_size": "string",
+        "confidence": "double",
+        "created_at": "string",
+    },
+}
+FORMAT_EXTENSIONS = {"ndjson": "ndjson", "parquet": "parquet", "arrow": "arrow"}
+EXPORT_INDEX = [("created_at", 1), ("id", 1)]
+
+def ensure_export_index(db, collection):
+    """Create the (created_at, id) index the export walks; a no-op if it exists"""
+    db[collection].create_index(EXPORT_INDEX)
+
+def has_export_index(db, collection) -> bool:
+    """Check for the export index without building it"""
+    return any(
+        [(field, int(direction)) for field, direction in index["key"]] == EXPORT_INDEX
+        for index in db[collection].index_information().values()
+    )
+
+def normalize_row(doc, fields):
+    """Coerce a Mongo document to the flat export schema"""
+    row = {}
+    for name, kind in fields.items():
+        value = doc.get(name)
+        if value is None:
+            row[name] = None
+        elif kind == "double":
+            row[name] = float(value)
+        elif isinstance(value, datetime):
+            row[name] = value.isoformat()
+        else:
+            row[name] = str(value)
+    return row
+
+def iter_export_batches(db, collection, batch_size=5000, after=None):
+    """Yield lists of normalized rows in (created_at, id) order.
+
+    `after` is a (created_at, id) pair; only documents strictly after it are
+    returned. Documents without a created_at cannot be ordered or resumed
+    from, so they are skipped. At most one batch is held in memory at a time.
+    """
+    from pymongo import ReadPreference
+
+    fields = EXPORT_FIELDS[collection]
+    query = {"created_at": {"$ne": None}}
+    if after:
+        created_at, last_id = after
+        # The top-level bound lets the hinted index seek to the checkpoint,
+        # the $or clauses can't be planned separately under a hint
+        query = {
+            "created_at": {"$gte": created_at},
+            "$or": [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "id": {"$gt": last_id}},
+            ],
+        }
+
+    source = db[collection].with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+    cursor = (
+        source.find(query, {"_id": 0, **{name: 1 for name in fields}})
+        .sort(EXPORT_INDEX)
+        .hint(EXPORT_INDEX)
+        .batch_size(batch_size)
+    )
+
+    batch = []
+    for doc in cursor:
+        batch.append(normalize_row(doc, fields))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class NDJSONPartWriter:
+    def __init__(self, path, collection):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write_batch(self, rows):
+        self.file.write("".join(json.dumps(row) + "\n" for row in rows))
+
+    def close(self):
+        self.file.close()
+
+class ArrowPartWriter:
+    """Write rows as Parquet row groups or Arrow IPC record batches.
+
+    Rows are buffered up to row_group_size, independently of the cursor batch
+    size, since small row groups compress badly and scan slowly.
+    """
+
+    def __init__(self, path, collection, fmt, row_group_size=100_000):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise SystemExit("pyarrow is required for parquet/arrow exports: pip install pyarrow")
+
+        types = {"string": pa.string(), "double": pa.float64()}
+        self.pa = pa
+        self.row_group_size = row_group_size
+        self.pending = []
+        self.schema = pa.schema([(name, types[kind]) for name, kind in EXPORT_FIELDS[collection].items()])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self.sink = None
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.sink = pa.OSFile(path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def write_batch(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            table = self.pa.Table.from_pylist(self.pending, schema=self.schema)
+            if self.sink is None:
+                self.writer.write_table(table, row_group_size=self.row_group_size)
+            else:
+                self.writer.write_table(table, max_chunksize=self.row_group_size)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+def open_part_writer(path, collection, fmt, row_group_size=100_000):
+    if fmt == "ndjson":
+        return NDJSONPartWriter(path, collection)
+    return ArrowPartWriter(path, collection, fmt, row_group_size=row_group_size)
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+class ProgressReporter:
+    def __init__(self, collection, out=sys.stderr, interval=5.0):
+        self.collection = collection
+        self.out = out
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.rows = 0
+
+    def add(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self, final=False):
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        label = "done" if final else "progress"
+        print(f"[{self.collection}] {label}: {self.rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)", file=self.out)
+
+def export_collection(db, collection, output_dir, fmt="ndjson", batch_size=5000,
+                      rows_per_file=1_000_000, row_group_size=100_000, restart=False, out=sys.stderr):
+    """Export one collection into part files under output_dir and return the row count"""
+    os.makedirs(output_dir, exist_ok=True)
+    ensure_export_index(db, collection)
+    checkpoint_path = os.path.join(output_dir, f"{collection}.checkpoint.json")
+    checkpoint = None if restart else load_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        checkpoint = {"collection": collection, "format": fmt, "created_at": None, "id": None,
+                      "rows_exported": 0, "parts": []}
+    elif checkpoint["format"] != fmt:
+        raise SystemExit(f"Checkpoint {checkpoint_path} was written for {checkpoint['format']}, not {fmt}")
+
+    after = None
+    if checkpoint["parts"]:
+        if checkpoint["created_at"] is None:
+            # Restarting from scratch would duplicate the parts already written
+            raise SystemExit(f"Checkpoint {checkpoint_path} has parts but no created_at; use --restart")
+        after = (checkpoint["created_at"], checkpoint["id"])
+    if after:
+        print(f"[{collection}] resuming after created_at={after[0]} id={after[1]}", file=out)
+
+    progress = ProgressReporter(collection, out=out)
+    writer = None
+    part_path = None
+    part_rows = 0
+    last_row = None
+
+    def finish_part():
+        nonlocal writer, part_rows
+        writer.close()
+        os.replace(f"{part_path}.tmp", part_path)
+        checkpoint["created_at"] = last_row["created_at"]
+        checkpoint["id"] = last_row["id"]
+        checkpoint["rows_exported"] += part_rows
+        checkpoint["parts"].append(os.path.basename(part_path))
+        save_checkpoint(checkpoint_path, checkpoint)
+        writer = None
+        part_rows = 0
+
+    for batch in iter_export_batches(db, collection, batch_size=batch_size, after=after):
+        if writer is None:
+            part_name = f"{collection}-{len(checkpoint['parts']):05d}.{FORMAT_EXTENSIONS[fmt]}"
+            part_path = os.path.join(output_dir, part_name)
+            writer = open_part_writer(f"{part_path}.tmp", collection, fmt, row_group_size=row_group_size)
+        writer.write_batch(batch)
+        part_rows += len(batch)
+        last_row = batch[-1]
+        progress.add(len(batch))
+        if part_rows >= rows_per_file:
+            finish_part()
+
+    if writer is not None:
+        finish_part()
+    progress.report(final=True)
+    return progress.rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream FitSnap analytics collections to files")
+    parser.add_argument("--collection", action="append", choices=sorted(EXPORT_FIELDS),
+                        help="collection to export (repeatable, default: all)")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="ndjson")
+    parser.add_argument("--output-dir", default="exports")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--rows-per-file", type=int, default=1_000_000)
+    parser.add_argument("--row-group-size", type=int, default=100_000,
+                        help="rows per Parquet row group / Arrow record batch")
+    parser.add_argument("--restart", action="store_true", help="ignore existing checkpoints")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from server import get_db, close_db
+
+    load_dotenv()
+    try:
+        for collection in args.collection or sorted(EXPORT_FIELDS):
+            export_collection(
+                get_db(),
+                collection,
+                args.output_dir,
+                fmt=args.format,
+                batch_size=args.batch_size,
+                rows_per_file=args.rows_per_file,
+                row_group_size=args.row_group_size,
+                restart=args.restart,
+            )
+    finally:
+        close_db()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,97 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
 from pydantic import BaseModel, Field
 from typing import Optional, List
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from collections import defaultdict
 import os
+import re
+import hmac
+import time
 import uuid
+import random
 import base64
+import hashlib
+import functools
+from io import BytesIO
 from datetime import datetime, timedelta
-from pymongo import MongoClient
-from dotenv import load_dotenv
 import json
+import asyncio
+import logging
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="FitSnap API", version="1.0.0")
+# MongoDB connection, created on first use so importing this module stays cheap
+_mongo_client = None
+
+def get_db():
+    """Return the fitsnap database, connecting to MongoDB on first call"""
+    global _mongo_client
+    if _mongo_client is None:
+        from pymongo import MongoClient
+
+        mongo_url = os.getenv("MONGO_URL", "mongodb://localhost:27017/fitsnap")
+        # Command monitoring costs something on every command, only pay for
+        # it when profiling can actually run
+        event_listeners = [build_db_timing_listener()] if _profiling_settings.enabled else []
+        _mongo_client = MongoClient(mongo_url, event_listeners=event_listeners)
+    return _mongo_client.fitsnap
+
+def warm_db(timeout: float = 2.0) -> bool:
+    """Ping MongoDB so the first request doesn't pay for connection setup"""
+    import pymongo
+
+    try:
+        with pymongo.timeout(timeout):
+            get_db().command("ping")
+    except pymongo.errors.PyMongoError as exc:
+        # Let the worker come up anyway, requests will retry the connection
+        logger.warning("MongoDB warm-up failed: %s", exc)
+        return False
+    return True
+
+def ensure_indexes():
+    """Create the indexes request paths rely on; a no-op once they exist"""
+    import pymongo
+
+    db = get_db()
+    try:
+        db.image_uploads.create_index("id")
+        # Unique so concurrent thumbnail upserts can't create duplicates
+        db.image_thumbnails.create_index(
+            [("upload_id", 1), ("view", 1), ("size", 1)],
+            unique=True
+        )
+    except pymongo.errors.PyMongoError as exc:
+        logger.warning("MongoDB index creation failed: %s", exc)
+
+def close_db():
+    """Close the MongoDB client if one was created"""
+    global _mongo_client
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load environment variables before any resource reads its configuration
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    configure_compression()
+    configure_profiling()
+    if await run_in_threadpool(warm_db):
+        await run_in_threadpool(ensure_indexes)
+    yield
+    close_db()
+
+app = FastAPI(title="FitSnap API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -25,14 +102,404 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB connection
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/fitsnap")
-client = MongoClient(MONGO_URL)
-db = client.fitsnap
+# Conditional GET and response compression
+class CompressionSettings(BaseModel):
+    enabled: bool = True
+    encodings: List[str] = ["br", "gzip"]
+    minimum_size: int = 500
+    gzip_level: int = 6
+    brotli_quality: int = 4
+
+READ_CACHE_CONTROL = "private, no-cache"
+INCOMPRESSIBLE_TYPE_PREFIXES = ("image/", "video/", "audio/")
+COMPRESSIBLE_IMAGE_TYPES = ("image/svg+xml",)
+ETAG_ENCODING_SUFFIX_RE = re.compile(r'-(?:br|gzip)"$')
+_compression_settings = CompressionSettings()
+
+def configure_compression():
+    """Read compression settings from the environment"""
+    global _compression_settings
+    encodings = os.getenv("COMPRESSION_ENCODINGS", "br,gzip")
+    _compression_settings = CompressionSettings(
+        enabled=os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes"),
+        encodings=[encoding.strip() for encoding in encodings.split(",") if encoding.strip()],
+        minimum_size=int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500")),
+        gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+    )
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag.
+
+    Tags handed out for compressed representations carry an encoding suffix,
+    which is ignored here since the underlying documents are the same.
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        ETAG_ENCODING_SUFFIX_RE.sub('"', tag.removeprefix("W/")) == etag for tag in candidates
+    )
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Derive the ETag of a content-coded representation"""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def content_etag(documents) -> str:
+    """Build a strong ETag by hashing the full content of the documents"""
+    payload = json.dumps(documents, sort_keys=True, default=str).encode()
+    return f'"{hashlib.sha256(payload).hexdigest()[:32]}"'
+
+def conditional_read(request: Request, response: Response, documents) -> Optional[Response]:
+    """Tag a read with a content ETag, or return a 304 if the client's copy is current"""
+    etag = content_etag(documents)
+    headers = {"ETag": etag, "Cache-Control": READ_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the first configured encoding the client accepts"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and (encoding != "br" or brotli_available()):
+            return encoding
+    return None
+
+@functools.lru_cache(maxsize=None)
+def brotli_available() -> bool:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in COMPRESSIBLE_IMAGE_TYPES:
+        return True
+    return bool(content_type) and not content_type.startswith(INCOMPRESSIBLE_TYPE_PREFIXES)
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    settings = _compression_settings
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(body, quality=settings.brotli_quality)
+    import gzip
+
+    return gzip.compress(body, compresslevel=settings.gzip_level)
+
+class CompressionMiddleware:
+    """Compress complete 200 responses with brotli or gzip.
+
+    Responses below the minimum size, streamed responses, partial content and
+    media types that are already compressed (images, video, audio) are sent
+    unchanged. Strong ETags get an encoding suffix so each representation
+    keeps a distinct validator.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        settings = _compression_settings
+        if scope["type"] != "http" or not settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), settings.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        held_start = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal held_start, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if message["status"] == 304 and "etag" in headers:
+                    # Echo the validator the client holds for the compressed variant
+                    variant = encoded_etag(headers["etag"], encoding)
+                    if variant in request_headers.get("if-none-match", ""):
+                        headers["etag"] = variant
+                if (
+                    message["status"] != 200
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type", ""))
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                held_start = message
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < settings.minimum_size:
+                passthrough = True
+                await send(held_start)
+                await send(message)
+                return
+
+            compressed = compress_body(body, encoding)
+            headers = MutableHeaders(scope=held_start)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                headers["etag"] = encoded_etag(headers["etag"], encoding)
+            await send(held_start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
+
+app.add_middleware(CompressionMiddleware)
+
+# Request profiling
+class ProfilingSettings(BaseModel):
+    enabled: bool = False
+    token: Optional[str] = None
+    sample_rate: float = 0.0
+    output_dir: str = "profiles"
+    max_files: int = 200
+
+PROFILING_HEADER = "x-fitsnap-profile"
+PROFILING_INTERVAL = 0.001
+PROFILE_SUFFIX = ".speedscope.json"
+_profiling_settings = ProfilingSettings()
+_request_timings: ContextVar = ContextVar("request_timings", default=None)
+
+def configure_profiling():
+    """Read profiling settings from the environment"""
+    global _profiling_settings
+    _profiling_settings = ProfilingSettings(
+        enabled=os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes"),
+        token=os.getenv("PROFILING_TOKEN") or None,
+        sample_rate=float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+        output_dir=os.getenv("PROFILING_DIR", "profiles"),
+        max_files=int(os.getenv("PROFILING_MAX_FILES", "200")),
+    )
+
+class RequestTimings:
+    """Per-phase durations for a single profiled request, in seconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.handler_started = None
+        self.handler_finished = None
+        self.phases = defaultdict(float)
+
+    def server_timing(self, finished: float) -> str:
+        handler_started = self.handler_started or finished
+        handler_finished = self.handler_finished or finished
+        measured = {
+            "parse": handler_started - self.started,
+            "db": self.phases["db"],
+            "encode": self.phases["encode"],
+            "app": handler_finished - handler_started - self.phases["db"] - self.phases["encode"],
+            "serialize": finished - handler_finished,
+            "total": finished - self.started,
+        }
+        return ", ".join(f"{name};dur={max(seconds, 0) * 1000:.2f}" for name, seconds in measured.items())
+
+def record_phase(name: str, seconds: float):
+    """Add time to a phase of the current request, if it is being profiled"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.phases[name] += seconds
+
+@contextmanager
+def timed_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+def build_db_timing_listener():
+    """Create a pymongo command listener that feeds the "db" phase"""
+    from pymongo import monitoring
+
+    class DBTimingListener(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            record_phase("db", event.duration_micros / 1_000_000)
+
+        def failed(self, event):
+            record_phase("db", event.duration_micros / 1_000_000)
+
+    return DBTimingListener()
+
+class TimedRoute(APIRoute):
+    """Route that marks when the endpoint starts and returns.
+
+    Everything before the endpoint runs (body reading, validation) counts as
+    "parse" and everything after it (response encoding) as "serialize".
+    """
+
+    def get_route_handler(self):
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                timings = _request_timings.get()
+                if timings is None:
+                    return await endpoint(*args, **kwargs)
+                timings.handler_started = time.perf_counter()
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    timings.handler_finished = time.perf_counter()
+
+            self.dependant.call = timed_endpoint
+        return super().get_route_handler()
+
+class ProfilingMiddleware:
+    """Profile selected requests with pyinstrument and report a Server-Timing header.
+
+    A request is profiled when profiling is enabled and it either carries the
+    configured token in the X-FitSnap-Profile header or is picked by the
+    sampling rate. Only token-authorized requests get the Server-Timing
+    breakdown; sampled ones just leave a profile behind. Other requests pass
+    straight through.
+
+    pyinstrument runs in async mode, so time spent in other requests'
+    coroutines while this one awaits is recorded as an await rather than
+    attributed to this request. Its sampling hook is per thread though, so
+    requests interleaved on the event loop pay a small overhead while a
+    profile is running.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.profiler_active = False
+
+    def has_valid_token(self, scope) -> bool:
+        token = _profiling_settings.token
+        if not token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILING_HEADER.encode() and hmac.compare_digest(value, token.encode()):
+                return True
+        return False
+
+    async def __call__(self, scope, receive, send):
+        settings = _profiling_settings
+        if not settings.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authorized = self.has_valid_token(scope)
+        sampled = (
+            not authorized
+            and settings.sample_rate > 0
+            and random.random() < settings.sample_rate
+        )
+        # Only one profiler runs at a time, so a sampled request that finds
+        # it busy is simply not profiled
+        if not authorized and (not sampled or self.profiler_active):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        if authorized:
+            timings = RequestTimings()
+            context_token = _request_timings.set(timings)
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(time.perf_counter()).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+        else:
+            context_token = None
+            send_with_timing = send
+
+        # Concurrent authorized requests still get Server-Timing but only the
+        # first one gets a profile
+        profiler = None
+        if not self.profiler_active:
+            self.profiler_active = True
+            profiler = Profiler(interval=PROFILING_INTERVAL, async_mode="enabled")
+            profiler.start()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if context_token is not None:
+                _request_timings.reset(context_token)
+            if profiler is not None:
+                profiler.stop()
+                self.profiler_active = False
+                try:
+                    await run_in_threadpool(self.dump_profile, profiler, scope)
+                except Exception:
+                    # Never let a failed dump replace the app's own exception
+                    logger.exception("Failed to write request profile")
+
+    def dump_profile(self, profiler, scope):
+        """Write the profile as speedscope JSON, viewable as a flame graph"""
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        settings = _profiling_settings
+        os.makedirs(settings.output_dir, exist_ok=True)
+        path_slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        filename = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}-{path_slug}{PROFILE_SUFFIX}"
+        with open(os.path.join(settings.output_dir, filename), "w", encoding="utf-8") as f:
+            f.write(profiler.output(SpeedscopeRenderer()))
+        self.prune_profiles(settings)
+
+    def prune_profiles(self, settings):
+        """Delete the oldest profiles beyond max_files, names sort by timestamp"""
+        profiles = sorted(name for name in os.listdir(settings.output_dir) if name.endswith(PROFILE_SUFFIX))
+        for name in profiles[:max(len(profiles) - settings.max_files, 0)]:
+            try:
+                os.remove(os.path.join(settings.output_dir, name))
+            except FileNotFoundError:
+                pass
+
+app.router.route_class = TimedRoute
+app.add_middleware(ProfilingMiddleware)
 
 # Security
 security = HTTPBearer()
 
+# Stored photo delivery
+UPLOAD_VIEWS = ("front", "side")
+THUMBNAIL_SIZES = {"thumb": 160, "small": 320, "medium": 640}
+UPLOAD_CACHE_CONTROL = "private, max-age=31536000, immutable"
+RANGE_HEADER_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Client-declared types trusted when the bytes can't be sniffed; anything
+# else (HTML, SVG, ...) must never render inline on the API origin
+CLIENT_IMAGE_TYPES = ("image/heic", "image/heif", "image/avif")
+# Multiple of 3 so streamed chunks line up with whole base64 quads
+UPLOAD_STREAM_CHUNK = 3 * 64 * 1024
+
 # Pydantic models
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -89,7 +556,7 @@ async def health_check():
 async def register_user(user: UserCreate):
     """Register a new user - placeholder for now"""
     # Check if user exists
-    existing_user = db.users.find_one({"email": user.email})
+    existing_user = get_db().users.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -102,14 +569,14 @@ async def register_user(user: UserCreate):
         "created_at": datetime.utcnow().isoformat()
     }
     
-    db.users.insert_one(user_data)
+    get_db().users.insert_one(user_data)
     return {"message": "User registered successfully", "user_id": user_data["id"]}
 
 @app.post("/api/users/login")
 async def login_user(user: UserLogin):
     """Login user - placeholder for now"""
     # Find user
-    db_user = db.users.find_one({"email": user.email})
+    db_user = get_db().users.find_one({"email": user.email})
     if not db_user or db_user["password"] != user.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -126,7 +593,7 @@ async def login_user(user: UserLogin):
 @app.get("/api/users/{user_id}")
 async def get_user(user_id: str):
     """Get user profile"""
-    user = db.users.find_one({"id": user_id})
+    user = get_db().users.find_one({"id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -148,8 +615,9 @@ async def upload_body_images(
     front_content = await front_image.read()
     side_content = await side_image.read()
     
-    front_b64 = base64.b64encode(front_content).decode('utf-8')
-    side_b64 = base64.b64encode(side_content).decode('utf-8')
+    with timed_phase("encode"):
+        front_b64 = base64.b64encode(front_content).decode('utf-8')
+        side_b64 = base64.b64encode(side_content).decode('utf-8')
     
     # Store upload record
     upload_data = {
@@ -157,12 +625,14 @@ async def upload_body_images(
         "user_id": user_id,
         "front_image": front_b64,
         "side_image": side_b64,
+        "front_content_type": front_image.content_type,
+        "side_content_type": side_image.content_type,
         "status": "processing",
         "created_at": datetime.utcnow().isoformat()
     }
     
     # Insert a copy to avoid MongoDB modifying the original
-    db.image_uploads.insert_one(upload_data.copy())
+    get_db().image_uploads.insert_one(upload_data.copy())
     
     # Simulate processing and generate placeholder measurements
     measurements = {
@@ -180,7 +650,7 @@ async def upload_body_images(
     }
     
     # Insert a copy to avoid MongoDB modifying the original
-    db.measurements.insert_one(measurements.copy())
+    get_db().measurements.insert_one(measurements.copy())
     
     return {
         "message": "Images uploaded and processed successfully",
@@ -189,9 +659,9 @@ async def upload_body_images(
     }
 
 @app.get("/api/measurements/{user_id}")
-async def get_user_measurements(user_id: str):
+async def get_user_measurements(user_id: str, request: Request, response: Response):
     """Get user's body measurements"""
-    measurements = list(db.measurements.find({"user_id": user_id}))
+    measurements = list(get_db().measurements.find({"user_id": user_id}))
     
     # Remove MongoDB _id from results
     for measurement in measurements:
@@ -214,13 +684,220 @@ async def get_user_measurements(user_id: str):
         }
         return [placeholder]
     
+    # Placeholders above are regenerated per call, so only real documents get an ETag
+    not_modified = conditional_read(request, response, measurements)
+    if not_modified:
+        return not_modified
     return measurements
 
+# Uploaded photo routes
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """Detect the image MIME type from its magic bytes"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def parse_range_header(range_header: str, total_length: int):
+    """Parse a single byte range into inclusive (start, end) offsets.
+
+    Returns None when the header should be ignored (malformed or multi-range),
+    and raises 416 when the range cannot be satisfied.
+    """
+    match = RANGE_HEADER_RE.match(range_header.strip())
+    if not match:
+        return None
+    start_str, end_str = match.groups()
+    unsatisfiable = HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{total_length}"}
+    )
+
+    if not start_str:
+        if not end_str:
+            return None
+        # Suffix range: the last N bytes
+        suffix_length = int(end_str)
+        if suffix_length == 0 or total_length == 0:
+            raise unsatisfiable
+        return max(total_length - suffix_length, 0), total_length - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else total_length - 1
+    if end < start:
+        return None
+    if start >= total_length:
+        raise unsatisfiable
+    return start, min(end, total_length - 1)
+
+def b64_decoded_length(encoded: str) -> int:
+    return len(encoded) // 4 * 3 - encoded[-2:].count("=")
+
+def decode_b64_range(encoded: str, start: int, end: int) -> bytes:
+    """Decode only the base64 quads covering bytes start..end (inclusive)"""
+    first_quad, last_quad = start // 3, end // 3
+    chunk = base64.b64decode(encoded[first_quad * 4:(last_quad + 1) * 4])
+    offset = start - first_quad * 3
+    return chunk[offset:offset + end - start + 1]
+
+def iter_b64_range(encoded: str, start: int, end: int):
+    """Yield decoded bytes start..end in UPLOAD_STREAM_CHUNK sized pieces"""
+    position = start
+    while position <= end:
+        stop = min(position + UPLOAD_STREAM_CHUNK - 1, end)
+        yield decode_b64_range(encoded, position, stop)
+        position = stop + 1
+
+def load_upload_image(upload_id: str, view: str):
+    """Fetch one stored photo as base64, projecting away the other view.
+
+    Photos are kept base64-encoded inside the upload document, so the string
+    is returned as-is and callers decode only the bytes they send.
+    """
+    upload = get_db().image_uploads.find_one(
+        {"id": upload_id},
+        {"_id": 0, f"{view}_image": 1, f"{view}_content_type": 1}
+    )
+    if not upload or not upload.get(f"{view}_image"):
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    encoded = upload[f"{view}_image"]
+    content_type = sniff_image_type(decode_b64_range(encoded, 0, 15))
+    if content_type is None:
+        declared_type = (upload.get(f"{view}_content_type") or "").split(";")[0].strip().lower()
+        content_type = declared_type if declared_type in CLIENT_IMAGE_TYPES else "application/octet-stream"
+    return encoded, content_type
+
+def build_thumbnail(data: bytes, max_side: int) -> bytes:
+    """Downscale an image to fit within max_side and re-encode it as JPEG"""
+    # Pillow is only needed for thumbnails, keep it off the startup path
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(data)) as img:
+        # Image.open only warns between 1x and 2x MAX_IMAGE_PIXELS; refuse
+        # those too. An explicit check avoids process-wide warning filters,
+        # which aren't thread-safe in the threadpool.
+        if Image.MAX_IMAGE_PIXELS and img.width * img.height > Image.MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"Image size ({img.width * img.height} pixels) exceeds limit"
+            )
+        # Let JPEG decode at a reduced scale before exif_transpose loads it
+        img.draft("RGB", (max_side, max_side))
+        # Phone photos are stored sideways with an EXIF orientation tag
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_side, max_side))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        output = BytesIO()
+        img.save(output, format="JPEG", quality=85, optimize=True)
+    return output.getvalue()
+
+async def load_upload_thumbnail(upload_id: str, view: str, size: str):
+    """Return a cached thumbnail, generating and storing it on first request"""
+    query = {"upload_id": upload_id, "view": view, "size": size}
+    cached = get_db().image_thumbnails.find_one(query, {"_id": 0, "data": 1})
+    if cached:
+        return bytes(cached["data"]), "image/jpeg"
+
+    from PIL import Image
+
+    encoded, _ = load_upload_image(upload_id, view)
+    try:
+        with timed_phase("encode"):
+            original = base64.b64decode(encoded)
+            data = await run_in_threadpool(build_thumbnail, original, THUMBNAIL_SIZES[size])
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise HTTPException(status_code=415, detail="Stored image cannot be resized")
+
+    from pymongo.errors import DuplicateKeyError
+
+    try:
+        get_db().image_thumbnails.update_one(
+            query,
+            {"$set": {**query, "data": data, "created_at": datetime.utcnow().isoformat()}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # A concurrent request cached the same thumbnail first
+        pass
+    return data, "image/jpeg"
+
+@app.get("/api/uploads/{upload_id}/{view}")
+async def get_upload_image(
+    upload_id: str,
+    view: str,
+    request: Request,
+    size: Optional[str] = None
+):
+    """Serve a stored body photo, or a resized thumbnail of it, as binary"""
+    if view not in UPLOAD_VIEWS:
+        raise HTTPException(status_code=404, detail="Image view not found")
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported size '{size}', expected one of: {', '.join(THUMBNAIL_SIZES)}"
+        )
+
+    # Uploads are immutable, so the ETag only depends on what was requested
+    etag = f'"{upload_id}-{view}-{size or "original"}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": UPLOAD_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        if not get_db().image_uploads.find_one({"id": upload_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return Response(status_code=304, headers=headers)
+
+    if size:
+        # Thumbnails are small raw bytes, slice them directly
+        data, content_type = await load_upload_thumbnail(upload_id, view, size)
+        total_length = len(data)
+    else:
+        encoded, content_type = load_upload_image(upload_id, view)
+        total_length = b64_decoded_length(encoded)
+    if not content_type.startswith("image/"):
+        # Unrecognized bytes are offered as a download, never rendered
+        headers["Content-Disposition"] = f'attachment; filename="{upload_id}-{view}"'
+
+    status_code = 200
+    start, end = 0, total_length - 1
+    range_header = request.headers.get("range")
+    # A stale If-Range validator means the client must get the full body
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_range_header(range_header, total_length)
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{total_length}"
+
+    if size:
+        body = [data[start:end + 1]]
+    else:
+        body = iter_b64_range(encoded, start, end)
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        body,
+        status_code=status_code,
+        media_type=content_type,
+        headers=headers
+    )
+
 # Size recommendations
 @app.get("/api/recommendations/{user_id}")
-async def get_size_recommendations(user_id: str):
+async def get_size_recommendations(user_id: str, request: Request, response: Response):
     """Get size recommendations for user"""
-    recommendations = list(db.recommendations.find({"user_id": user_id}))
+    recommendations = list(get_db().recommendations.find({"user_id": user_id}))
     
     # Remove MongoDB _id from results
     for rec in recommendations:
@@ -259,13 +936,17 @@ async def get_size_recommendations(user_id: str):
         ]
         return placeholder_recs
     
+    # Placeholders above are regenerated per call, so only real documents get an ETag
+    not_modified = conditional_read(request, response, recommendations)
+    if not_modified:
+        return not_modified
     return recommendations
 
 # Brands routes
 @app.get("/api/brands")
-async def get_brands():
+async def get_brands(request: Request, response: Response):
     """Get all supported brands"""
-    brands = list(db.brands.find())
+    brands = list(get_db().brands.find())
     
     # Remove MongoDB _id from results
     for brand in brands:
@@ -305,18 +986,63 @@ async def get_brands():
         ]
         return placeholder_brands
     
+    # Placeholders above are regenerated per call, so only real documents get an ETag
+    not_modified = conditional_read(request, response, brands)
+    if not_modified:
+        return not_modified
     return brands
 
 @app.get("/api/brands/{brand_id}")
 async def get_brand(brand_id: str):
     """Get specific brand details"""
-    brand = db.brands.find_one({"id": brand_id})
+    brand = get_db().brands.find_one({"id": brand_id})
     if not brand:
         raise HTTPException(status_code=404, detail="Brand not found")
     
     brand.pop("_id", None)
     return brand
 
+# Analytics export
+@app.get("/api/export/{collection}")
+async def export_collection_ndjson(
+    collection: str,
+    since: Optional[str] = None,
+    after_id: Optional[str] = None,
+    batch_size: int = 5000,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Stream a whole collection as NDJSON, ordered by created_at then id.
+
+    Pass the created_at and id of the last received row as since/after_id to
+    resume an interrupted export.
+    """
+    from export_analytics import EXPORT_FIELDS, has_export_index, iter_export_batches
+
+    export_token = os.getenv("EXPORT_TOKEN")
+    if not export_token or not hmac.compare_digest(credentials.credentials.encode(), export_token.encode()):
+        raise HTTPException(status_code=403, detail="Export not authorized")
+    if collection not in EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail="Collection not exportable")
+    if after_id and not since:
+        raise HTTPException(status_code=400, detail="after_id requires since")
+
+    # Never build the index from a request; the hinted query would fail
+    # mid-stream without it, so refuse before the 200 status goes out
+    if not await run_in_threadpool(has_export_index, get_db(), collection):
+        raise HTTPException(
+            status_code=503,
+            detail="Export index on (created_at, id) is missing; run export_analytics.py to create it"
+        )
+    after = (since, after_id or "") if since else None
+    batches = iter_export_batches(get_db(), collection, batch_size=max(1, min(batch_size, 50000)), after=after)
+
+    def ndjson_lines():
+        # Runs in the threadpool, one cursor batch in memory at a time
+        for batch in batches:
+            yield "".join(json.dumps(row) + "\n" for row in batch)
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 # Virtual try-on placeholder
 @app.post("/api/virtual-tryon")
 async def virtual_tryon(
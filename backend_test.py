@@ -11,6 +11,10 @@ import sys
 from io import BytesIO
 from PIL import Image
 import base64
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+import bench_startup
 
 # Get backend URL from frontend .env file
 BACKEND_URL = "http://localhost:8001"
@@ -22,6 +26,7 @@ class FitSnapAPITester:
         self.test_user_id = None
         self.test_user_email = None
         self.test_brand_id = None
+        self.test_upload_id = None
         self.results = []
         
     def log_result(self, test_name, success, message, response_data=None):
@@ -227,6 +232,7 @@ class FitSnapAPITester:
                     measurements = data["measurements"]
                     measurement_fields = ["chest", "waist", "hips", "height", "weight"]
                     if all(field in measurements for field in measurement_fields):
+                        self.test_upload_id = data["upload_id"]  # Store for image delivery test
                         self.log_result("Measurements Upload", True, "Images uploaded and processed successfully", data)
                     else:
                         missing = [f for f in measurement_fields if f not in measurements]
@@ -240,6 +246,49 @@ class FitSnapAPITester:
         except Exception as e:
             self.log_result("Measurements Upload", False, f"Request failed: {str(e)}")
             
+    def test_get_upload_image(self):
+        """Test GET /api/uploads/{upload_id}/{view} with ranges, ETags and thumbnails"""
+        if not self.test_upload_id:
+            self.log_result("Get Upload Image", False, "No test upload ID available")
+            return
+            
+        try:
+            url = f"{API_BASE}/uploads/{self.test_upload_id}/front"
+            response = self.session.get(url)
+            
+            if response.status_code != 200:
+                self.log_result("Get Upload Image", False, f"HTTP {response.status_code}: {response.text}")
+                return
+            if response.headers.get("content-type") != "image/jpeg" or "etag" not in response.headers:
+                self.log_result("Get Upload Image", False, f"Unexpected headers: {dict(response.headers)}")
+                return
+            full_body = response.content
+            etag = response.headers["etag"]
+            
+            partial = self.session.get(url, headers={"Range": "bytes=0-99"})
+            if partial.status_code != 206 or partial.content != full_body[:100]:
+                self.log_result("Get Upload Image", False, f"Range request failed: HTTP {partial.status_code}")
+                return
+            
+            not_modified = self.session.get(url, headers={"If-None-Match": etag})
+            if not_modified.status_code != 304:
+                self.log_result("Get Upload Image", False, f"Expected 304, got {not_modified.status_code}")
+                return
+            
+            thumbnail = self.session.get(url, params={"size": "thumb"})
+            if thumbnail.status_code != 200:
+                self.log_result("Get Upload Image", False, f"Thumbnail HTTP {thumbnail.status_code}: {thumbnail.text}")
+                return
+            thumb_img = Image.open(BytesIO(thumbnail.content))
+            if max(thumb_img.size) > 160:
+                self.log_result("Get Upload Image", False, f"Thumbnail too large: {thumb_img.size}")
+                return
+            
+            self.log_result("Get Upload Image", True, f"Image served ({len(full_body)} bytes, thumbnail {len(thumbnail.content)} bytes)")
+                
+        except Exception as e:
+            self.log_result("Get Upload Image", False, f"Request failed: {str(e)}")
+            
     def test_get_user_measurements(self):
         """Test GET /api/measurements/{user_id}"""
         test_user = self.test_user_id or "demo-user"
@@ -381,6 +430,150 @@ class FitSnapAPITester:
         except Exception as e:
             self.log_result("Virtual Try-On", False, f"Request failed: {str(e)}")
             
+    def test_read_compression_and_etag(self):
+        """Test gzip compression on GET /api/brands and 304 revalidation of stored measurements"""
+        try:
+            response = self.session.get(f"{API_BASE}/brands", headers={"Accept-Encoding": "gzip"})
+            
+            if response.status_code != 200:
+                self.log_result("Read Compression and ETag", False, f"HTTP {response.status_code}: {response.text}")
+                return
+            if response.headers.get("content-encoding") != "gzip":
+                self.log_result("Read Compression and ETag", False, f"Expected gzip, got headers: {dict(response.headers)}")
+                return
+            
+            # The upload test stored measurements for demo-user; placeholders carry no ETag
+            url = f"{API_BASE}/measurements/demo-user"
+            response = self.session.get(url, headers={"Accept-Encoding": "gzip"})
+            etag = response.headers.get("etag")
+            if not etag:
+                self.log_result("Read Compression and ETag", False, "Missing ETag header on stored measurements")
+                return
+            
+            not_modified = self.session.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+            if not_modified.status_code != 304:
+                self.log_result("Read Compression and ETag", False, f"Expected 304, got {not_modified.status_code}")
+                return
+            
+            if self.test_upload_id:
+                image = self.session.get(f"{API_BASE}/uploads/{self.test_upload_id}/front", headers={"Accept-Encoding": "gzip, br"})
+                if "content-encoding" in image.headers:
+                    self.log_result("Read Compression and ETag", False, f"Image was re-compressed: {image.headers['content-encoding']}")
+                    return
+            
+            self.log_result("Read Compression and ETag", True, f"Compressed response with ETag {etag} revalidated as 304")
+                
+        except Exception as e:
+            self.log_result("Read Compression and ETag", False, f"Request failed: {str(e)}")
+            
+    def test_profiling_server_timing(self):
+        """Test the opt-in profiling hook on GET /api/brands"""
+        profiling_token = os.getenv("PROFILING_TOKEN")
+        
+        try:
+            if not profiling_token:
+                # Without a token requests must pass through untouched
+                response = self.session.get(f"{API_BASE}/brands", headers={"X-FitSnap-Profile": "not-the-token"})
+                if response.status_code == 200 and "server-timing" not in response.headers:
+                    self.log_result("Profiling Server-Timing", True, "Unprofiled request has no Server-Timing header")
+                else:
+                    self.log_result("Profiling Server-Timing", False, f"Unexpected response: HTTP {response.status_code} {dict(response.headers)}")
+                return
+            
+            response = self.session.get(f"{API_BASE}/brands", headers={"X-FitSnap-Profile": profiling_token})
+            
+            if response.status_code == 200:
+                server_timing = response.headers.get("server-timing", "")
+                phases = ["parse", "db", "encode", "app", "serialize", "total"]
+                missing = [p for p in phases if f"{p};dur=" not in server_timing]
+                if not missing:
+                    self.log_result("Profiling Server-Timing", True, f"Server-Timing: {server_timing}")
+                else:
+                    self.log_result("Profiling Server-Timing", False, f"Missing phases {missing} in Server-Timing: {server_timing!r}")
+            else:
+                self.log_result("Profiling Server-Timing", False, f"HTTP {response.status_code}: {response.text}")
+                
+        except Exception as e:
+            self.log_result("Profiling Server-Timing", False, f"Request failed: {str(e)}")
+            
+    def test_analytics_export(self):
+        """Test GET /api/export/{collection} NDJSON streaming"""
+        export_token = os.getenv("EXPORT_TOKEN")
+        
+        try:
+            if not export_token:
+                # Without a configured token the export must stay closed
+                response = self.session.get(f"{API_BASE}/export/measurements", headers={"Authorization": "Bearer not-the-token"})
+                if response.status_code == 403:
+                    self.log_result("Analytics Export", True, "Export correctly refused without a valid token")
+                else:
+                    self.log_result("Analytics Export", False, f"Expected 403, got {response.status_code}")
+                return
+            
+            headers = {"Authorization": f"Bearer {export_token}"}
+            response = self.session.get(f"{API_BASE}/export/measurements", headers=headers, params={"batch_size": 2}, stream=True)
+            
+            if response.status_code != 200:
+                self.log_result("Analytics Export", False, f"HTTP {response.status_code}: {response.text}")
+                return
+            
+            rows = [json.loads(line) for line in response.iter_lines() if line]
+            created = [row["created_at"] for row in rows]
+            if created != sorted(created):
+                self.log_result("Analytics Export", False, "Rows are not ordered by created_at")
+                return
+            if rows and not all("chest" in row and "user_id" in row for row in rows):
+                self.log_result("Analytics Export", False, f"Unexpected row shape: {rows[0]}")
+                return
+            
+            if rows:
+                last = rows[-1]
+                resumed = self.session.get(
+                    f"{API_BASE}/export/measurements",
+                    headers=headers,
+                    params={"since": last["created_at"], "after_id": last["id"]}
+                )
+                if resumed.status_code != 200 or resumed.text.strip():
+                    self.log_result("Analytics Export", False, f"Resume after last row returned data: HTTP {resumed.status_code}")
+                    return
+            
+            self.log_result("Analytics Export", True, f"Streamed {len(rows)} measurement rows")
+                
+        except Exception as e:
+            self.log_result("Analytics Export", False, f"Request failed: {str(e)}")
+            
+    def test_startup_budget(self):
+        """Test that the backend imports lazily and starts within budget"""
+        try:
+            # Importing the app must not connect to MongoDB or load Pillow
+            lazy_check = subprocess.run(
+                [sys.executable, "-c",
+                 "import sys, server; "
+                 "assert server._mongo_client is None, 'MongoClient created at import'; "
+                 "assert 'PIL' not in sys.modules, 'Pillow imported at startup'"],
+                cwd=bench_startup.BACKEND_DIR,
+                capture_output=True,
+                text=True
+            )
+            if lazy_check.returncode != 0:
+                self.log_result("Startup Budget", False, f"Eager import detected: {lazy_check.stderr.strip()}")
+                return
+            
+            import_ms, slowest = bench_startup.measure_import_time()
+            if import_ms > bench_startup.IMPORT_BUDGET_MS:
+                self.log_result("Startup Budget", False, f"Import took {import_ms:.0f} ms (budget {bench_startup.IMPORT_BUDGET_MS:.0f} ms), slowest: {slowest[:3]}")
+                return
+            
+            first_response_ms = bench_startup.measure_time_to_first_response()
+            if first_response_ms > bench_startup.FIRST_RESPONSE_BUDGET_MS:
+                self.log_result("Startup Budget", False, f"First response after {first_response_ms:.0f} ms (budget {bench_startup.FIRST_RESPONSE_BUDGET_MS:.0f} ms)")
+                return
+            
+            self.log_result("Startup Budget", True, f"Import {import_ms:.0f} ms, first response {first_response_ms:.0f} ms")
+                
+        except Exception as e:
+            self.log_result("Startup Budget", False, f"Benchmark failed: {str(e)}")
+            
     def run_all_tests(self):
         """Run all API tests"""
         print("🚀 Starting FitSnap Backend API Tests")
@@ -395,12 +588,17 @@ class FitSnapAPITester:
         self.test_get_user_profile()
         self.test_get_nonexistent_user()
         self.test_measurements_upload()
+        self.test_get_upload_image()
         self.test_get_user_measurements()
         self.test_get_size_recommendations()
         self.test_get_brands()
         self.test_get_specific_brand()
         self.test_get_nonexistent_brand()
+        self.test_read_compression_and_etag()
         self.test_virtual_tryon()
+        self.test_profiling_server_timing()
+        self.test_analytics_export()
+        self.test_startup_budget()
         
         # Summary
         print("\n" + "=" * 50)